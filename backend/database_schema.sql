@@ -175,6 +175,8 @@ CREATE TABLE IF NOT EXISTS reject_history (
     notes TEXT,
     status VARCHAR(50) NOT NULL,
     approved_by UUID REFERENCES profiles(id),
+    unit_price DECIMAL(12, 2),
+    loss_amount DECIMAL(12, 2),
     created_at TIMESTAMP WITH TIME ZONE,
     approved_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -188,7 +190,6 @@ CREATE TABLE IF NOT EXISTS stock_opname (
     admin_id UUID REFERENCES profiles(id),
     total_sales DECIMAL(12, 2) DEFAULT 0,
     notes TEXT,
-    details JSONB,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -203,6 +204,18 @@ CREATE TABLE IF NOT EXISTS gps_locations (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- =====================================================
+-- 16. STOCK OPNAME ITEMS TABLE (Sales per product of a stock opname)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS stock_opname_items (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    opname_id UUID REFERENCES stock_opname(id) ON DELETE CASCADE,
+    product_id UUID REFERENCES products(id) ON DELETE SET NULL,
+    product_name VARCHAR(255),
+    quantity_sold INTEGER NOT NULL,
+    sale_amount DECIMAL(12, 2) NOT NULL
+);
+
 -- =====================================================
 -- INDEXES FOR PERFORMANCE
 -- =====================================================
@@ -220,6 +233,53 @@ CREATE INDEX IF NOT EXISTS idx_returns_status ON returns(status);
 CREATE INDEX IF NOT EXISTS idx_rejects_status ON rejects(status);
 CREATE INDEX IF NOT EXISTS idx_stock_opname_rider_id ON stock_opname(rider_id);
 CREATE INDEX IF NOT EXISTS idx_stock_opname_created_at ON stock_opname(created_at);
+CREATE INDEX IF NOT EXISTS idx_stock_opname_items_opname_id ON stock_opname_items(opname_id);
+CREATE INDEX IF NOT EXISTS idx_reject_history_created_at ON reject_history(created_at);
+CREATE INDEX IF NOT EXISTS idx_returns_rider_id_status ON returns(rider_id, status);
+CREATE INDEX IF NOT EXISTS idx_rejects_rider_id_status ON rejects(rider_id, status);
+CREATE INDEX IF NOT EXISTS idx_distributions_rider_id_distributed_at ON distributions(rider_id, distributed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_rider_id_created_at ON transactions(rider_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_returns_status_returned_at ON returns(status, returned_at DESC);
+
+-- =====================================================
+-- FUNCTIONS (reporting aggregates, queried by the API)
+-- =====================================================
+-- Sales per rider, highest first. Called from the API with
+-- SELECT * FROM leaderboard($1, $2)
+CREATE OR REPLACE FUNCTION leaderboard(p_start TIMESTAMPTZ DEFAULT NULL, p_end TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE(rider_id UUID, full_name TEXT, avatar_url TEXT, total_sales NUMERIC, total_transactions BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT t.rider_id,
+           COALESCE(p.full_name, 'Unknown')::TEXT,
+           p.avatar_url,
+           SUM(t.total_amount),
+           COUNT(*)
+    FROM transactions t
+    LEFT JOIN profiles p ON p.id = t.rider_id
+    WHERE (p_start IS NULL OR t.created_at >= p_start)
+      AND (p_end IS NULL OR t.created_at <= p_end)
+    GROUP BY t.rider_id, p.full_name, p.avatar_url
+    ORDER BY 4 DESC
+$$;
+
+-- Sales totals plus reject losses for the reports page. Losses are not
+-- filtered by rider, matching the previous API behaviour.
+CREATE OR REPLACE FUNCTION report_summary(p_rider UUID DEFAULT NULL, p_start TIMESTAMPTZ DEFAULT NULL, p_end TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE(total_sales NUMERIC, total_transactions BIGINT, total_loss NUMERIC)
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(SUM(t.total_amount), 0),
+           COUNT(*),
+           COALESCE((
+               SELECT SUM(rh.loss_amount)
+               FROM reject_history rh
+               WHERE (p_start IS NULL OR rh.created_at >= p_start)
+                 AND (p_end IS NULL OR rh.created_at <= p_end)
+           ), 0)
+    FROM transactions t
+    WHERE (p_rider IS NULL OR t.rider_id = p_rider)
+      AND (p_start IS NULL OR t.created_at >= p_start)
+      AND (p_end IS NULL OR t.created_at <= p_end)
+$$;
 
 -- =====================================================
 -- DISABLE RLS FOR SIMPLICITY (Using API authentication)
@@ -239,6 +299,7 @@ ALTER TABLE rejects ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reject_history ENABLE ROW LEVEL SECURITY;
 ALTER TABLE stock_opname ENABLE ROW LEVEL SECURITY;
 ALTER TABLE gps_locations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stock_opname_items ENABLE ROW LEVEL SECURITY;
 
 -- Create policies to allow all operations via service role / anon key
 CREATE POLICY "Allow all for profiles" ON profiles FOR ALL USING (true) WITH CHECK (true);
@@ -256,6 +317,7 @@ CREATE POLICY "Allow all for rejects" ON rejects FOR ALL USING (true) WITH CHECK
 CREATE POLICY "Allow all for reject_history" ON reject_history FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "Allow all for stock_opname" ON stock_opname FOR ALL USING (true) WITH CHECK (true);
 CREATE POLICY "Allow all for gps_locations" ON gps_locations FOR ALL USING (true) WITH CHECK (true);
+CREATE POLICY "Allow all for stock_opname_items" ON stock_opname_items FOR ALL USING (true) WITH CHECK (true);
 
 -- =====================================================
 -- INSERT DEFAULT SUPER ADMIN
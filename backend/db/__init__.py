@@ -0,0 +1,3 @@
+from .pool import PoolConfig, init_pool, close_pool, get_pool, insert_records, record_to_dict
+
+__all__ = ["PoolConfig", "init_pool", "close_pool", "get_pool", "insert_records", "record_to_dict"]
@@ -0,0 +1,114 @@
+"""
+asyncpg connection pool shared by the API routes.
+The pool is created once on startup and handed to routes via Depends(get_pool).
+"""
+
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional, Sequence
+
+import asyncpg
+import orjson
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    dsn: str
+    min_size: int = 10
+    max_size: int = 50
+    max_inactive_connection_lifetime: float = 300
+    statement_cache_size: int = 1024
+    max_queries: int = 50000
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(dsn=os.environ.get('DATABASE_URL'))
+
+
+_pool: Optional[asyncpg.Pool] = None
+
+# Below this many rows a prepared executemany beats the COPY setup cost
+COPY_THRESHOLD = 5
+
+# COPY FROM is rejected on tables with row level security enabled (all of ours)
+# unless the role bypasses RLS, so it is only used when init_pool finds it can
+_copy_supported = False
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    # Decode json/jsonb columns to Python objects like PostgREST does
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
+
+async def init_pool(config: PoolConfig) -> asyncpg.Pool:
+    global _pool, _copy_supported
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            dsn=config.dsn,
+            min_size=config.min_size,
+            max_size=config.max_size,
+            max_inactive_connection_lifetime=config.max_inactive_connection_lifetime,
+            statement_cache_size=config.statement_cache_size,
+            max_queries=config.max_queries,
+            init=_init_connection,
+        )
+        _copy_supported = bool(await _pool.fetchval(
+            "SELECT rolsuper OR rolbypassrls FROM pg_roles WHERE rolname = current_user"
+        ))
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise RuntimeError("Database pool is not initialized")
+    return _pool
+
+
+async def insert_records(
+    conn: asyncpg.Connection, table: str, columns: Sequence[str], records: List[tuple]
+):
+    """
+    Bulk insert rows, streaming them with COPY once the batch is large enough.
+    COPY needs a role with BYPASSRLS (e.g. the Supabase postgres/service role);
+    with any other role every batch goes through the prepared INSERT.
+    """
+    if _copy_supported and len(records) > COPY_THRESHOLD:
+        await conn.copy_records_to_table(table, records=records, columns=list(columns))
+    elif records:
+        placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+        await conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", records
+        )
+
+
+def _to_json_value(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def record_to_dict(record: Optional[asyncpg.Record]) -> Optional[dict]:
+    """Convert a record into the same JSON-friendly dict shape PostgREST returns"""
+    if record is None:
+        return None
+    return {key: _to_json_value(value) for key, value in record.items()}
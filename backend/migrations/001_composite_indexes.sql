@@ -0,0 +1,17 @@
+-- =====================================================
+-- 001 - COMPOSITE INDEXES FOR HOT FILTERS
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get these from database_schema.sql)
+-- =====================================================
+
+-- rider_stock(rider_id, product_id) and profiles(email) are already
+-- covered by their UNIQUE constraints.
+
+-- Distribution history per rider, newest first
+CREATE INDEX IF NOT EXISTS idx_distributions_rider_id_distributed_at ON distributions(rider_id, distributed_at DESC);
+
+-- Transactions per rider, newest first
+CREATE INDEX IF NOT EXISTS idx_transactions_rider_id_created_at ON transactions(rider_id, created_at DESC);
+
+-- Returns by status, newest first
+CREATE INDEX IF NOT EXISTS idx_returns_status_returned_at ON returns(status, returned_at DESC);
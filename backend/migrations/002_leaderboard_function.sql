@@ -0,0 +1,23 @@
+-- =====================================================
+-- 002 - LEADERBOARD AGGREGATION FUNCTION
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get this from database_schema.sql)
+-- =====================================================
+
+-- Sales per rider, highest first. Called from the API with
+-- SELECT * FROM leaderboard($1, $2)
+CREATE OR REPLACE FUNCTION leaderboard(p_start TIMESTAMPTZ DEFAULT NULL, p_end TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE(rider_id UUID, full_name TEXT, avatar_url TEXT, total_sales NUMERIC, total_transactions BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT t.rider_id,
+           COALESCE(p.full_name, 'Unknown')::TEXT,
+           p.avatar_url,
+           SUM(t.total_amount),
+           COUNT(*)
+    FROM transactions t
+    LEFT JOIN profiles p ON p.id = t.rider_id
+    WHERE (p_start IS NULL OR t.created_at >= p_start)
+      AND (p_end IS NULL OR t.created_at <= p_end)
+    GROUP BY t.rider_id, p.full_name, p.avatar_url
+    ORDER BY 4 DESC
+$$;
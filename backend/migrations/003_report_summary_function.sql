@@ -0,0 +1,25 @@
+-- =====================================================
+-- 003 - REPORT SUMMARY AGGREGATION FUNCTION
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get this from database_schema.sql)
+-- =====================================================
+
+-- Sales totals plus reject losses for the reports page. Losses are not
+-- filtered by rider, matching the previous API behaviour.
+CREATE OR REPLACE FUNCTION report_summary(p_rider UUID DEFAULT NULL, p_start TIMESTAMPTZ DEFAULT NULL, p_end TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE(total_sales NUMERIC, total_transactions BIGINT, total_loss NUMERIC)
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(SUM(t.total_amount), 0),
+           COUNT(*),
+           COALESCE((
+               SELECT SUM(rh.quantity * pr.price)
+               FROM reject_history rh
+               JOIN products pr ON pr.id = rh.product_id
+               WHERE (p_start IS NULL OR rh.created_at >= p_start)
+                 AND (p_end IS NULL OR rh.created_at <= p_end)
+           ), 0)
+    FROM transactions t
+    WHERE (p_rider IS NULL OR t.rider_id = p_rider)
+      AND (p_start IS NULL OR t.created_at >= p_start)
+      AND (p_end IS NULL OR t.created_at <= p_end)
+$$;
@@ -0,0 +1,35 @@
+-- =====================================================
+-- 004 - SNAPSHOT REJECT LOSS AT APPROVAL TIME
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get this from database_schema.sql)
+-- =====================================================
+
+-- Price and loss are stored when a reject is approved, so later price
+-- changes no longer rewrite historical losses
+ALTER TABLE reject_history ADD COLUMN IF NOT EXISTS unit_price DECIMAL(12, 2);
+ALTER TABLE reject_history ADD COLUMN IF NOT EXISTS loss_amount DECIMAL(12, 2);
+
+-- Backfill existing rows from the current product price
+UPDATE reject_history rh
+SET unit_price = p.price,
+    loss_amount = rh.quantity * p.price
+FROM products p
+WHERE p.id = rh.product_id AND rh.loss_amount IS NULL;
+
+-- Report summary now sums the stored losses instead of joining products
+CREATE OR REPLACE FUNCTION report_summary(p_rider UUID DEFAULT NULL, p_start TIMESTAMPTZ DEFAULT NULL, p_end TIMESTAMPTZ DEFAULT NULL)
+RETURNS TABLE(total_sales NUMERIC, total_transactions BIGINT, total_loss NUMERIC)
+LANGUAGE sql STABLE AS $$
+    SELECT COALESCE(SUM(t.total_amount), 0),
+           COUNT(*),
+           COALESCE((
+               SELECT SUM(rh.loss_amount)
+               FROM reject_history rh
+               WHERE (p_start IS NULL OR rh.created_at >= p_start)
+                 AND (p_end IS NULL OR rh.created_at <= p_end)
+           ), 0)
+    FROM transactions t
+    WHERE (p_rider IS NULL OR t.rider_id = p_rider)
+      AND (p_start IS NULL OR t.created_at >= p_start)
+      AND (p_end IS NULL OR t.created_at <= p_end)
+$$;
@@ -0,0 +1,50 @@
+-- =====================================================
+-- 005 - STOCK OPNAME ITEMS TABLE
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get this from database_schema.sql)
+-- =====================================================
+
+-- Per-product sales of a stock opname, replacing the stock_opname.details JSON
+CREATE TABLE IF NOT EXISTS stock_opname_items (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    opname_id UUID REFERENCES stock_opname(id) ON DELETE CASCADE,
+    product_id UUID REFERENCES products(id) ON DELETE SET NULL,
+    product_name VARCHAR(255),
+    quantity_sold INTEGER NOT NULL,
+    sale_amount DECIMAL(12, 2) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_opname_items_opname_id ON stock_opname_items(opname_id);
+
+ALTER TABLE stock_opname_items ENABLE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS "Allow all for stock_opname_items" ON stock_opname_items;
+CREATE POLICY "Allow all for stock_opname_items" ON stock_opname_items FOR ALL USING (true) WITH CHECK (true);
+
+-- Move existing details into the new table. Older rows stored the list as a
+-- JSON-encoded string, so unwrap those first. A product_id that is not a
+-- valid UUID is kept as NULL, like a deleted product.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'stock_opname' AND column_name = 'details'
+    ) THEN
+        INSERT INTO stock_opname_items (opname_id, product_id, product_name, quantity_sold, sale_amount)
+        SELECT o.id,
+               p.id,
+               d->>'product_name',
+               (d->>'quantity_sold')::INTEGER,
+               (d->>'sale_amount')::DECIMAL
+        FROM stock_opname o
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE jsonb_typeof(o.details) WHEN 'string' THEN (o.details #>> '{}')::JSONB ELSE o.details END
+        ) AS d
+        LEFT JOIN products p ON p.id = CASE
+            WHEN d->>'product_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+            THEN (d->>'product_id')::UUID
+        END
+        WHERE o.details IS NOT NULL;
+
+        ALTER TABLE stock_opname DROP COLUMN details;
+    END IF;
+END $$;
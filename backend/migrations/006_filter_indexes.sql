@@ -0,0 +1,16 @@
+-- =====================================================
+-- 006 - INDEXES FOR REMAINING FILTER PATTERNS
+-- Run this SQL in Supabase SQL Editor on existing databases
+-- (new databases get these from database_schema.sql)
+-- =====================================================
+
+-- rider_stock(rider_id, product_id) and gps_locations(rider_id) are covered by
+-- their UNIQUE constraints; user_roles(user_id) and
+-- transactions(rider_id, created_at) are indexed already.
+
+-- Loss totals by date range in report_summary()
+CREATE INDEX IF NOT EXISTS idx_reject_history_created_at ON reject_history(created_at);
+
+-- A rider's pending returns / rejects
+CREATE INDEX IF NOT EXISTS idx_returns_rider_id_status ON returns(rider_id, status);
+CREATE INDEX IF NOT EXISTS idx_rejects_rider_id_status ON rejects(rider_id, status);
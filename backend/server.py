@@ -1,18 +1,36 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from supabase import create_client, Client
+from postgrest import ReturnMethod
 import os
+import asyncio
+import functools
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
+import time
+from collections import deque
+import base64
+import hashlib
+import hmac
 import jwt
+import orjson
+from cachetools import TTLCache
 from passlib.context import CryptContext
-import json
+import asyncpg
+from db import PoolConfig, init_pool, close_pool, get_pool, insert_records, record_to_dict
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -21,14 +39,55 @@ load_dotenv(ROOT_DIR / '.env')
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_ANON_KEY')
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default-secret-key')
+JWT_KEY_BYTES = JWT_SECRET.encode()
+
+# Clients are built on first use so importing the app stays cheap
+@functools.cache
+def get_supabase() -> Client:
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+# Password hashing (argon2id for new hashes, bcrypt kept to verify existing users)
+@functools.cache
+def get_pwd_context() -> CryptContext:
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=2,
+        argon2__memory_cost=65536,
+        argon2__parallelism=1,
+    )
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Dedicated threads for the blocking Supabase client, kept apart from the default
+# executor so slow HTTP calls cannot starve password hashing (and vice versa)
+SUPABASE_THREADS = int(os.environ.get('SUPABASE_THREADS', '32'))
+supabase_executor: Optional[ThreadPoolExecutor] = None
+
+# Addresses of the reverse proxies / ingress in front of the API, e.g. "10.0.0.2,10.0.0.3".
+# Must be set when deployed behind one: otherwise every login appears to come from the
+# proxy and all users share a single rate limit bucket.
+TRUSTED_PROXIES = frozenset(ip.strip() for ip in os.environ.get('TRUSTED_PROXIES', '').split(',') if ip.strip())
+untrusted_forwarded_warned = False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker resources: each uvicorn worker process opens its own pool and threads"""
+    global supabase_executor
+    supabase_executor = ThreadPoolExecutor(max_workers=SUPABASE_THREADS, thread_name_prefix="supabase")
+    await init_pool(PoolConfig.from_env())
+    if not TRUSTED_PROXIES:
+        logger.warning("TRUSTED_PROXIES is not set; login rate limiting uses the direct peer address")
+    # Pay the one-off dummy hash now so the first unknown-email login is not slower than the rest
+    await asyncio.to_thread(dummy_password_hash)
+    try:
+        yield
+    finally:
+        await close_pool()
+        supabase_executor.shutdown(wait=False)
+        supabase_executor = None
 
 # Create the main app
-app = FastAPI(title="POS Rider System", version="1.0.0")
+app = FastAPI(title="POS Rider System", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -36,11 +95,35 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Validated tokens -> (user, exp) so repeat requests skip jwt.decode and the profile lookup
+token_cache = TTLCache(maxsize=10_000, ttl=300)
+
+# Login rate limit per client IP, counted per worker (N workers allow N x LOGIN_RATE_LIMIT)
+LOGIN_RATE_LIMIT = 5
+LOGIN_RATE_WINDOW = 10  # seconds
+login_attempts = TTLCache(maxsize=10_000, ttl=LOGIN_RATE_WINDOW)
+
+# Categories rarely change; cleared by create/delete
+CATEGORY_CACHE_TTL = 60  # seconds
+category_cache = {"at": 0, "data": None}
+
+# Admin map dashboards poll in lockstep, so share one response per `since` for a few seconds
+LOCATIONS_LIMIT = 500
+location_cache = TTLCache(maxsize=256, ttl=3)
+
+# Report aggregates keyed by endpoint and filters, cleared when sales or losses are recorded
+report_cache = TTLCache(maxsize=1024, ttl=45)
+
+# Configure logging (records are written by a listener thread so handlers never block the event loop)
+log_queue = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, log_handler)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
 # ==================== MODELS ====================
@@ -109,7 +192,7 @@ class ProductionCreate(BaseModel):
 
 # Distribution Models
 class DistributionItem(BaseModel):
-    product_id: str
+    product_id: uuid.UUID
     quantity: int
 
 class DistributionCreate(BaseModel):
@@ -119,7 +202,7 @@ class DistributionCreate(BaseModel):
 
 # Transaction Models
 class TransactionItem(BaseModel):
-    product_id: str
+    product_id: uuid.UUID
     quantity: int
     price: float
 
@@ -142,7 +225,7 @@ class RejectCreate(BaseModel):
 
 # Stock Opname Models
 class StockOpnameItem(BaseModel):
-    product_id: str
+    product_id: uuid.UUID
     remaining_quantity: int
 
 class StockOpnameCreate(BaseModel):
@@ -164,10 +247,90 @@ class ProfileUpdate(BaseModel):
 # ==================== HELPER FUNCTIONS ====================
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+@functools.cache
+def dummy_password_hash() -> str:
+    """Hash checked against when the email is unknown, so every login costs the same"""
+    return hash_password("dummy-password")
+
+def verify_dummy_password(plain_password: str) -> bool:
+    """Hash-and-verify for unknown emails; run it in a worker thread, never on the event loop"""
+    return verify_password(plain_password, dummy_password_hash())
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when a legacy bcrypt hash should be replaced"""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+def warn_untrusted_forwarded(peer: str):
+    """Log once per worker that a proxy is forwarding requests but is not in TRUSTED_PROXIES"""
+    global untrusted_forwarded_warned
+    if untrusted_forwarded_warned:
+        return
+    untrusted_forwarded_warned = True
+    logger.warning(
+        f"X-Forwarded-For received from untrusted peer {peer}; login rate limiting is keyed on "
+        f"that address. Add it to TRUSTED_PROXIES if it is your proxy."
+    )
+
+def client_ip(request: Request) -> str:
+    """Peer address, or the hop appended by a trusted proxy (X-Forwarded-For is client-controlled otherwise)"""
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded:
+        return peer
+    if peer not in TRUSTED_PROXIES:
+        warn_untrusted_forwarded(peer)
+        return peer
+    # Walk right to left past our own proxies; the first other hop is what the outermost one saw
+    for hop in reversed([h.strip() for h in forwarded.split(",")]):
+        if hop and hop not in TRUSTED_PROXIES:
+            return hop
+    return peer
+
+def check_login_rate(ip: str):
+    now = time.monotonic()
+    attempts = login_attempts.get(ip) or deque()
+    while attempts and now - attempts[0] > LOGIN_RATE_WINDOW:
+        attempts.popleft()
+    if len(attempts) >= LOGIN_RATE_LIMIT:
+        raise HTTPException(status_code=429, detail="Too many login attempts, please try again later")
+    attempts.append(now)
+    login_attempts[ip] = attempts
+
+async def run_query(query):
+    """Execute a Supabase query in a worker thread so it does not block the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(supabase_executor, query.execute)
+
+def sum_quantities(items) -> dict:
+    """Merge line items into {product_id: total quantity} so each product is touched once"""
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def encode_cursor(row: dict) -> str:
+    """Opaque keyset cursor pointing at a row of a list ordered by (created_at, id) DESC"""
+    return base64.urlsafe_b64encode(f"{row['created_at']}|{row['id']}".encode()).decode()
+
+def decode_cursor(cursor: Optional[str]):
+    """Return the (created_at, id) a page should start after, or (None, None) for the first page"""
+    if not cursor:
+        return None, None
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(rows, limit: int) -> dict:
+    """Build a page from rows fetched with LIMIT limit + 1"""
+    items = [record_to_dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -176,27 +339,83 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(days=7)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
+    encoded_jwt = jwt.encode(to_encode, JWT_KEY_BYTES, algorithm="HS256")
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify an HS256 token issued by create_access_token.
+    Checks the signature with hmac directly instead of going through jwt.decode's
+    per-call option handling; raises the same PyJWT exceptions.
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = orjson.loads(_b64url_decode(header_b64))
+        payload = orjson.loads(_b64url_decode(payload_b64))
+        signature = _b64url_decode(signature_b64)
+    except ValueError:
+        raise jwt.DecodeError("Malformed token")
+    
+    if not isinstance(header, dict) or header.get("alg") != "HS256" or not isinstance(payload, dict):
+        raise jwt.InvalidTokenError("Unsupported token")
+    
+    expected = hmac.new(JWT_KEY_BYTES, f"{header_b64}.{payload_b64}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)):
+            raise jwt.DecodeError("Expiration Time claim (exp) must be a number")
+        if exp <= time.time():
+            raise jwt.ExpiredSignatureError("Signature has expired")
+    
+    return payload
+
+def revoke_token(token: str):
+    token_cache.pop(token, None)
+
+def invalidate_cached_user(user_id: str):
+    """Drop every cached token of a user whose profile or role changed"""
+    for token, (cached_user, _) in list(token_cache.items()):
+        if cached_user["id"] == user_id:
+            token_cache.pop(token, None)
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        # Get user from database
-        result = supabase.table("profiles").select("*").eq("id", user_id).execute()
-        if not result.data:
+        # The role is always read from user_roles; the "role" claim is only a hint.
+        # A demotion or removal applies at once in this worker and within
+        # token_cache's TTL in the others, not when the token expires.
+        row = await pool.fetchrow(
+            "SELECT p.id, p.email, p.full_name, p.phone, p.avatar_url, p.created_at, "
+            "COALESCE(r.role, 'rider') AS role "
+            "FROM profiles p LEFT JOIN user_roles r ON r.user_id = p.id WHERE p.id = $1",
+            user_id
+        )
+        if row is None:
             raise HTTPException(status_code=401, detail="User not found")
         
-        user = result.data[0]
+        user = record_to_dict(row)
         
-        # Get user role
-        role_result = supabase.table("user_roles").select("role").eq("user_id", user_id).execute()
-        user["role"] = role_result.data[0]["role"] if role_result.data else "rider"
+        # Only successfully validated tokens are cached, never beyond their own expiry
+        if payload.get("exp"):
+            token_cache[token] = (user, payload["exp"])
         
         return user
     except jwt.ExpiredSignatureError:
@@ -217,37 +436,30 @@ def require_super_admin(user: dict = Depends(get_current_user)):
 # ==================== AUTH ROUTES ====================
 
 @api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserRegister):
+async def register(user_data: UserRegister, pool: asyncpg.Pool = Depends(get_pool)):
     try:
-        # Check if email already exists
-        existing = supabase.table("profiles").select("id").eq("email", user_data.email).execute()
-        if existing.data:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        user_id = str(uuid.uuid4())
-        hashed_password = hash_password(user_data.password)
-        
-        # Create profile
-        profile_data = {
-            "id": user_id,
-            "email": user_data.email,
-            "full_name": user_data.full_name,
-            "phone": user_data.phone,
-            "password_hash": hashed_password,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        supabase.table("profiles").insert(profile_data).execute()
-        
-        # Create user role
-        role_data = {
-            "id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "role": user_data.role
-        }
-        supabase.table("user_roles").insert(role_data).execute()
+        hashed_password = await asyncio.to_thread(hash_password, user_data.password)
+        
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Create profile; no row back means the email already exists
+                user_id = await conn.fetchval(
+                    "INSERT INTO profiles (email, full_name, phone, password_hash, created_at) "
+                    "VALUES ($1, $2, $3, $4, NOW()) ON CONFLICT (email) DO NOTHING RETURNING id",
+                    user_data.email, user_data.full_name, user_data.phone, hashed_password
+                )
+                if user_id is None:
+                    raise HTTPException(status_code=400, detail="Email already registered")
+                user_id = str(user_id)
+                
+                # Create user role
+                await conn.execute(
+                    "INSERT INTO user_roles (user_id, role) VALUES ($1, $2) ON CONFLICT (user_id) DO NOTHING",
+                    user_id, user_data.role
+                )
         
         # Generate token
-        access_token = create_access_token({"sub": user_id})
+        access_token = create_access_token({"sub": user_id, "role": user_data.role})
         
         return TokenResponse(
             access_token=access_token,
@@ -266,25 +478,37 @@ async def register(user_data: UserRegister):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(request: Request, credentials: UserLogin, pool: asyncpg.Pool = Depends(get_pool)):
     try:
-        # Get user by email
-        result = supabase.table("profiles").select("*").eq("email", credentials.email).execute()
-        if not result.data:
+        check_login_rate(client_ip(request))
+        
+        # Get user and role by email
+        row = await pool.fetchrow(
+            "SELECT p.id, p.email, p.full_name, p.phone, p.avatar_url, p.created_at, p.password_hash, "
+            "COALESCE(r.role, 'rider') AS role "
+            "FROM profiles p LEFT JOIN user_roles r ON r.user_id = p.id WHERE p.email = $1",
+            credentials.email
+        )
+        if row is None:
+            # Same hashing cost as a real user so unknown emails are neither cheaper nor detectable
+            await asyncio.to_thread(verify_dummy_password, credentials.password)
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        user = result.data[0]
+        user = record_to_dict(row)
         
-        # Verify password
-        if not verify_password(credentials.password, user.get("password_hash", "")):
+        # Verify password off the event loop
+        valid, new_hash = await asyncio.to_thread(
+            verify_and_update_password, credentials.password, user.get("password_hash") or ""
+        )
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        # Get user role
-        role_result = supabase.table("user_roles").select("role").eq("user_id", user["id"]).execute()
-        role = role_result.data[0]["role"] if role_result.data else "rider"
+        # Rehash legacy bcrypt passwords with argon2id
+        if new_hash:
+            await pool.execute("UPDATE profiles SET password_hash = $2 WHERE id = $1", user["id"], new_hash)
         
         # Generate token
-        access_token = create_access_token({"sub": user["id"]})
+        access_token = create_access_token({"sub": user["id"], "role": user["role"]})
         
         return TokenResponse(
             access_token=access_token,
@@ -293,7 +517,7 @@ async def login(credentials: UserLogin):
                 email=user["email"],
                 full_name=user["full_name"],
                 phone=user.get("phone"),
-                role=role,
+                role=user["role"],
                 avatar_url=user.get("avatar_url"),
                 created_at=user.get("created_at")
             )
@@ -328,7 +552,8 @@ async def update_profile(profile_data: ProfileUpdate, user: dict = Depends(get_c
             update_data["avatar_url"] = profile_data.avatar_url
         
         if update_data:
-            supabase.table("profiles").update(update_data).eq("id", user["id"]).execute()
+            await run_query(get_supabase().table("profiles").update(update_data, returning=ReturnMethod.minimal).eq("id", user["id"]))
+            invalidate_cached_user(user["id"])
         
         return {"message": "Profile updated successfully"}
     except Exception as e:
@@ -337,11 +562,15 @@ async def update_profile(profile_data: ProfileUpdate, user: dict = Depends(get_c
 
 # ==================== CATEGORY ROUTES ====================
 
-@api_router.get("/categories", response_model=List[CategoryResponse])
+@api_router.get("/categories", response_model=None)
 async def get_categories(user: dict = Depends(get_current_user)):
     try:
-        result = supabase.table("categories").select("*").order("name").execute()
-        return [CategoryResponse(**cat) for cat in result.data]
+        if category_cache["data"] is not None and time.monotonic() - category_cache["at"] < CATEGORY_CACHE_TTL:
+            return category_cache["data"]
+        
+        result = await run_query(get_supabase().table("categories").select("id, name, created_at").order("name"))
+        category_cache.update(at=time.monotonic(), data=result.data)
+        return result.data
     except Exception as e:
         logger.error(f"Get categories error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -349,14 +578,12 @@ async def get_categories(user: dict = Depends(get_current_user)):
 @api_router.post("/categories", response_model=CategoryResponse)
 async def create_category(category: CategoryCreate, user: dict = Depends(require_admin)):
     try:
-        cat_id = str(uuid.uuid4())
         data = {
-            "id": cat_id,
-            "name": category.name,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "name": category.name
         }
-        supabase.table("categories").insert(data).execute()
-        return CategoryResponse(**data)
+        result = await run_query(get_supabase().table("categories").insert(data))
+        category_cache["data"] = None
+        return CategoryResponse(**result.data[0])
     except Exception as e:
         logger.error(f"Create category error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -364,7 +591,8 @@ async def create_category(category: CategoryCreate, user: dict = Depends(require
 @api_router.delete("/categories/{category_id}")
 async def delete_category(category_id: str, user: dict = Depends(require_admin)):
     try:
-        supabase.table("categories").delete().eq("id", category_id).execute()
+        await run_query(get_supabase().table("categories").delete(returning=ReturnMethod.minimal).eq("id", category_id))
+        category_cache["data"] = None
         return {"message": "Category deleted successfully"}
     except Exception as e:
         logger.error(f"Delete category error: {e}")
@@ -372,26 +600,16 @@ async def delete_category(category_id: str, user: dict = Depends(require_admin))
 
 # ==================== PRODUCT ROUTES ====================
 
-@api_router.get("/products", response_model=List[ProductResponse])
+@api_router.get("/products", response_model=None)
 async def get_products(user: dict = Depends(get_current_user)):
     try:
-        result = supabase.table("products").select("*, categories(name)").order("name").execute()
-        products = []
+        result = await run_query(get_supabase().table("products").select(
+            "id, name, sku, price, stock_in_warehouse, category_id, image_url, min_stock, created_at, categories(name)"
+        ).order("name"))
         for p in result.data:
-            cat_name = p.get("categories", {}).get("name") if p.get("categories") else None
-            products.append(ProductResponse(
-                id=p["id"],
-                name=p["name"],
-                sku=p.get("sku"),
-                price=p["price"],
-                stock_in_warehouse=p.get("stock_in_warehouse", 0),
-                category_id=p.get("category_id"),
-                category_name=cat_name,
-                image_url=p.get("image_url"),
-                min_stock=p.get("min_stock", 10),
-                created_at=p.get("created_at")
-            ))
-        return products
+            category = p.pop("categories", None)
+            p["category_name"] = category.get("name") if category else None
+        return result.data
     except Exception as e:
         logger.error(f"Get products error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -399,20 +617,17 @@ async def get_products(user: dict = Depends(get_current_user)):
 @api_router.post("/products", response_model=ProductResponse)
 async def create_product(product: ProductCreate, user: dict = Depends(require_admin)):
     try:
-        prod_id = str(uuid.uuid4())
         data = {
-            "id": prod_id,
             "name": product.name,
             "sku": product.sku,
             "price": product.price,
             "stock_in_warehouse": 0,
             "category_id": product.category_id,
             "image_url": product.image_url,
-            "min_stock": product.min_stock,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "min_stock": product.min_stock
         }
-        supabase.table("products").insert(data).execute()
-        return ProductResponse(**data)
+        result = await run_query(get_supabase().table("products").insert(data))
+        return ProductResponse(**result.data[0])
     except Exception as e:
         logger.error(f"Create product error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -428,7 +643,7 @@ async def update_product(product_id: str, product: ProductCreate, user: dict = D
             "image_url": product.image_url,
             "min_stock": product.min_stock
         }
-        result = supabase.table("products").update(update_data).eq("id", product_id).execute()
+        result = await run_query(get_supabase().table("products").update(update_data).eq("id", product_id))
         if result.data:
             return ProductResponse(**result.data[0])
         raise HTTPException(status_code=404, detail="Product not found")
@@ -441,7 +656,7 @@ async def update_product(product_id: str, product: ProductCreate, user: dict = D
 @api_router.delete("/products/{product_id}")
 async def delete_product(product_id: str, user: dict = Depends(require_admin)):
     try:
-        supabase.table("products").delete().eq("id", product_id).execute()
+        await run_query(get_supabase().table("products").delete(returning=ReturnMethod.minimal).eq("id", product_id))
         return {"message": "Product deleted successfully"}
     except Exception as e:
         logger.error(f"Delete product error: {e}")
@@ -450,29 +665,29 @@ async def delete_product(product_id: str, user: dict = Depends(require_admin)):
 # ==================== PRODUCTION ROUTES ====================
 
 @api_router.post("/productions")
-async def create_production(production: ProductionCreate, user: dict = Depends(require_admin)):
+async def create_production(
+    production: ProductionCreate,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        # Get current product
-        result = supabase.table("products").select("stock_in_warehouse").eq("id", production.product_id).execute()
-        if not result.data:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        current_stock = result.data[0]["stock_in_warehouse"]
-        new_stock = current_stock + production.quantity
-        
-        # Update product stock
-        supabase.table("products").update({"stock_in_warehouse": new_stock}).eq("id", production.product_id).execute()
-        
-        # Record production history
-        prod_record = {
-            "id": str(uuid.uuid4()),
-            "product_id": production.product_id,
-            "quantity": production.quantity,
-            "admin_id": user["id"],
-            "notes": production.notes,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        supabase.table("productions").insert(prod_record).execute()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Increase product stock
+                new_stock = await conn.fetchval(
+                    "UPDATE products SET stock_in_warehouse = stock_in_warehouse + $2 WHERE id = $1 "
+                    "RETURNING stock_in_warehouse",
+                    production.product_id, production.quantity
+                )
+                if new_stock is None:
+                    raise HTTPException(status_code=404, detail="Product not found")
+                
+                # Record production history
+                await conn.execute(
+                    "INSERT INTO productions (product_id, quantity, admin_id, notes, created_at) "
+                    "VALUES ($1, $2, $3, $4, NOW())",
+                    production.product_id, production.quantity, user["id"], production.notes
+                )
         
         return {"message": "Production recorded successfully", "new_stock": new_stock}
     except HTTPException:
@@ -484,7 +699,7 @@ async def create_production(production: ProductionCreate, user: dict = Depends(r
 @api_router.get("/productions")
 async def get_productions(user: dict = Depends(require_admin)):
     try:
-        result = supabase.table("productions").select("*, products(name), profiles(full_name)").order("created_at", desc=True).limit(100).execute()
+        result = await run_query(get_supabase().table("productions").select("*, products(name), profiles(full_name)").order("created_at", desc=True).limit(100))
         return result.data
     except Exception as e:
         logger.error(f"Get productions error: {e}")
@@ -493,52 +708,54 @@ async def get_productions(user: dict = Depends(require_admin)):
 # ==================== DISTRIBUTION ROUTES ====================
 
 @api_router.post("/distributions")
-async def create_distribution(dist: DistributionCreate, user: dict = Depends(require_admin)):
+async def create_distribution(
+    dist: DistributionCreate,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        for item in dist.items:
-            # Check warehouse stock
-            prod_result = supabase.table("products").select("stock_in_warehouse, name").eq("id", item.product_id).execute()
-            if not prod_result.data:
-                raise HTTPException(status_code=404, detail=f"Product not found")
-            
-            warehouse_stock = prod_result.data[0]["stock_in_warehouse"]
-            if warehouse_stock < item.quantity:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Insufficient stock for {prod_result.data[0]['name']}. Available: {warehouse_stock}"
+        quantities = sum_quantities(dist.items)
+        product_ids = list(quantities)
+        
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Decrease warehouse stock only where enough is available
+                updated = await conn.fetch(
+                    "UPDATE products p SET stock_in_warehouse = p.stock_in_warehouse - v.qty "
+                    "FROM unnest($1::uuid[], $2::int[]) AS v(id, qty) "
+                    "WHERE p.id = v.id AND p.stock_in_warehouse >= v.qty RETURNING p.id",
+                    product_ids, list(quantities.values())
+                )
+                if len(updated) < len(product_ids):
+                    updated_ids = {r["id"] for r in updated}
+                    failed_id = next(pid for pid in product_ids if pid not in updated_ids)
+                    product = await conn.fetchrow(
+                        "SELECT stock_in_warehouse, name FROM products WHERE id = $1", failed_id
+                    )
+                    if product is None:
+                        raise HTTPException(status_code=404, detail=f"Product not found")
+                    raise HTTPException(
+                        status_code=400, 
+                        detail=f"Insufficient stock for {product['name']}. Available: {product['stock_in_warehouse']}"
+                    )
+                
+                # Add to rider stock
+                await conn.executemany(
+                    "INSERT INTO rider_stock (rider_id, product_id, quantity) VALUES ($1, $2, $3) "
+                    "ON CONFLICT (rider_id, product_id) DO UPDATE SET quantity = rider_stock.quantity + EXCLUDED.quantity",
+                    [(dist.rider_id, pid, qty) for pid, qty in quantities.items()]
+                )
+                
+                # Record distribution history
+                distributed_at = datetime.now(timezone.utc)
+                await insert_records(
+                    conn, "distributions",
+                    ["rider_id", "product_id", "quantity", "admin_id", "notes", "distributed_at"],
+                    [
+                        (dist.rider_id, item.product_id, item.quantity, user["id"], dist.notes, distributed_at)
+                        for item in dist.items
+                    ]
                 )
-            
-            # Decrease warehouse stock
-            supabase.table("products").update({
-                "stock_in_warehouse": warehouse_stock - item.quantity
-            }).eq("id", item.product_id).execute()
-            
-            # Get current rider stock
-            rider_stock = supabase.table("rider_stock").select("quantity").eq("rider_id", dist.rider_id).eq("product_id", item.product_id).execute()
-            
-            if rider_stock.data:
-                # Update existing rider stock
-                new_qty = rider_stock.data[0]["quantity"] + item.quantity
-                supabase.table("rider_stock").update({"quantity": new_qty}).eq("rider_id", dist.rider_id).eq("product_id", item.product_id).execute()
-            else:
-                # Create new rider stock
-                supabase.table("rider_stock").insert({
-                    "id": str(uuid.uuid4()),
-                    "rider_id": dist.rider_id,
-                    "product_id": item.product_id,
-                    "quantity": item.quantity
-                }).execute()
-            
-            # Record distribution history
-            supabase.table("distributions").insert({
-                "id": str(uuid.uuid4()),
-                "rider_id": dist.rider_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "admin_id": user["id"],
-                "notes": dist.notes,
-                "distributed_at": datetime.now(timezone.utc).isoformat()
-            }).execute()
         
         return {"message": "Distribution successful"}
     except HTTPException:
@@ -555,7 +772,7 @@ async def get_distributions(
     user: dict = Depends(require_admin)
 ):
     try:
-        query = supabase.table("distributions").select("*, products(name), rider:profiles!distributions_rider_id_fkey(full_name), admin:profiles!distributions_admin_id_fkey(full_name)")
+        query = get_supabase().table("distributions").select("*, products(name), rider:profiles!distributions_rider_id_fkey(full_name), admin:profiles!distributions_admin_id_fkey(full_name)")
         
         if rider_id:
             query = query.eq("rider_id", rider_id)
@@ -564,7 +781,7 @@ async def get_distributions(
         if end_date:
             query = query.lte("distributed_at", end_date)
         
-        result = query.order("distributed_at", desc=True).limit(500).execute()
+        result = await run_query(query.order("distributed_at", desc=True).limit(500))
         return result.data
     except Exception as e:
         logger.error(f"Get distributions error: {e}")
@@ -577,9 +794,9 @@ async def get_rider_stock(user: dict = Depends(get_current_user)):
     """Get current user's stock (for rider) or all rider stocks (for admin)"""
     try:
         if user.get("role") in ["admin", "super_admin"]:
-            result = supabase.table("rider_stock").select("*, products(name, price, image_url), profiles(full_name)").execute()
+            result = await run_query(get_supabase().table("rider_stock").select("*, products(name, price, image_url), profiles(full_name)"))
         else:
-            result = supabase.table("rider_stock").select("*, products(name, price, image_url)").eq("rider_id", user["id"]).execute()
+            result = await run_query(get_supabase().table("rider_stock").select("*, products(name, price, image_url)").eq("rider_id", user["id"]))
         return result.data
     except Exception as e:
         logger.error(f"Get rider stock error: {e}")
@@ -589,7 +806,7 @@ async def get_rider_stock(user: dict = Depends(get_current_user)):
 async def get_rider_stock_by_id(rider_id: str, user: dict = Depends(require_admin)):
     """Get specific rider's stock (admin only)"""
     try:
-        result = supabase.table("rider_stock").select("*, products(name, price, image_url)").eq("rider_id", rider_id).execute()
+        result = await run_query(get_supabase().table("rider_stock").select("*, products(name, price, image_url)").eq("rider_id", rider_id))
         return result.data
     except Exception as e:
         logger.error(f"Get rider stock error: {e}")
@@ -598,52 +815,51 @@ async def get_rider_stock_by_id(rider_id: str, user: dict = Depends(require_admi
 # ==================== TRANSACTION ROUTES (POS) ====================
 
 @api_router.post("/transactions")
-async def create_transaction(trans: TransactionCreate, user: dict = Depends(get_current_user)):
+async def create_transaction(
+    trans: TransactionCreate,
+    user: dict = Depends(get_current_user),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        trans_id = str(uuid.uuid4())
-        total_amount = 0
-        
-        # Validate and prepare items
-        for item in trans.items:
-            # Check rider stock
-            stock_result = supabase.table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", item.product_id).execute()
-            
-            if not stock_result.data or stock_result.data[0]["quantity"] < item.quantity:
-                raise HTTPException(status_code=400, detail="Insufficient stock")
-            
-            total_amount += item.price * item.quantity
-        
-        # Create transaction
-        supabase.table("transactions").insert({
-            "id": trans_id,
-            "rider_id": user["id"],
-            "total_amount": total_amount,
-            "payment_method": trans.payment_method,
-            "notes": trans.notes,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }).execute()
-        
-        # Create transaction items and update stock
-        for item in trans.items:
-            # Insert transaction item
-            supabase.table("transaction_items").insert({
-                "id": str(uuid.uuid4()),
-                "transaction_id": trans_id,
-                "product_id": item.product_id,
-                "quantity": item.quantity,
-                "price": item.price,
-                "subtotal": item.price * item.quantity
-            }).execute()
-            
-            # Update rider stock
-            stock_result = supabase.table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", item.product_id).execute()
-            new_qty = stock_result.data[0]["quantity"] - item.quantity
-            
-            if new_qty <= 0:
-                supabase.table("rider_stock").delete().eq("rider_id", user["id"]).eq("product_id", item.product_id).execute()
-            else:
-                supabase.table("rider_stock").update({"quantity": new_qty}).eq("rider_id", user["id"]).eq("product_id", item.product_id).execute()
+        total_amount = sum(item.price * item.quantity for item in trans.items)
+        quantities = sum_quantities(trans.items)
+        
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Decrease rider stock only where enough is available
+                updated = await conn.fetch(
+                    "UPDATE rider_stock s SET quantity = s.quantity - v.qty "
+                    "FROM unnest($2::uuid[], $3::int[]) AS v(product_id, qty) "
+                    "WHERE s.rider_id = $1 AND s.product_id = v.product_id AND s.quantity >= v.qty "
+                    "RETURNING s.product_id",
+                    user["id"], list(quantities), list(quantities.values())
+                )
+                if len(updated) < len(quantities):
+                    raise HTTPException(status_code=400, detail="Insufficient stock")
+                await conn.execute(
+                    "DELETE FROM rider_stock WHERE rider_id = $1 AND product_id = ANY($2::uuid[]) AND quantity <= 0",
+                    user["id"], list(quantities)
+                )
+                
+                # Create transaction
+                trans_id = str(await conn.fetchval(
+                    "INSERT INTO transactions (rider_id, total_amount, payment_method, notes, created_at) "
+                    "VALUES ($1, $2, $3, $4, NOW()) RETURNING id",
+                    user["id"], total_amount, trans.payment_method, trans.notes
+                ))
+                
+                # Create transaction items
+                await insert_records(
+                    conn, "transaction_items",
+                    ["transaction_id", "product_id", "quantity", "price", "subtotal"],
+                    [
+                        (trans_id, item.product_id, item.quantity,
+                         item.price, item.price * item.quantity)
+                        for item in trans.items
+                    ]
+                )
         
+        report_cache.clear()
         return {"message": "Transaction successful", "transaction_id": trans_id, "total": total_amount}
     except HTTPException:
         raise
@@ -660,18 +876,18 @@ async def get_transactions(
 ):
     try:
         if user.get("role") in ["admin", "super_admin"]:
-            query = supabase.table("transactions").select("*, profiles(full_name)")
+            query = get_supabase().table("transactions").select("*, profiles(full_name)")
             if rider_id:
                 query = query.eq("rider_id", rider_id)
         else:
-            query = supabase.table("transactions").select("*").eq("rider_id", user["id"])
+            query = get_supabase().table("transactions").select("*").eq("rider_id", user["id"])
         
         if start_date:
             query = query.gte("created_at", start_date)
         if end_date:
             query = query.lte("created_at", end_date)
         
-        result = query.order("created_at", desc=True).execute()
+        result = await run_query(query.order("created_at", desc=True))
         return result.data
     except Exception as e:
         logger.error(f"Get transactions error: {e}")
@@ -680,14 +896,14 @@ async def get_transactions(
 @api_router.get("/transactions/{transaction_id}")
 async def get_transaction_detail(transaction_id: str, user: dict = Depends(get_current_user)):
     try:
-        # Get transaction
-        trans = supabase.table("transactions").select("*, profiles(full_name)").eq("id", transaction_id).execute()
+        # Get transaction and its items in parallel
+        trans, items = await asyncio.gather(
+            run_query(get_supabase().table("transactions").select("*, profiles(full_name)").eq("id", transaction_id)),
+            run_query(get_supabase().table("transaction_items").select("*, products(name)").eq("transaction_id", transaction_id))
+        )
         if not trans.data:
             raise HTTPException(status_code=404, detail="Transaction not found")
         
-        # Get items
-        items = supabase.table("transaction_items").select("*, products(name)").eq("transaction_id", transaction_id).execute()
-        
         result = trans.data[0]
         result["items"] = items.data
         return result
@@ -703,22 +919,20 @@ async def get_transaction_detail(transaction_id: str, user: dict = Depends(get_c
 async def create_return(ret: ReturnCreate, user: dict = Depends(get_current_user)):
     try:
         # Check rider stock
-        stock_result = supabase.table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", ret.product_id).execute()
+        stock_result = await run_query(get_supabase().table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", ret.product_id))
         
         if not stock_result.data or stock_result.data[0]["quantity"] < ret.quantity:
             raise HTTPException(status_code=400, detail="Insufficient stock for return")
         
         # Create return request
         return_data = {
-            "id": str(uuid.uuid4()),
             "rider_id": user["id"],
             "product_id": ret.product_id,
             "quantity": ret.quantity,
             "notes": ret.notes,
-            "status": "pending",
-            "returned_at": datetime.now(timezone.utc).isoformat()
+            "status": "pending"
         }
-        supabase.table("returns").insert(return_data).execute()
+        await run_query(get_supabase().table("returns").insert(return_data, returning=ReturnMethod.minimal))
         
         return {"message": "Return request submitted successfully"}
     except HTTPException:
@@ -731,65 +945,67 @@ async def create_return(ret: ReturnCreate, user: dict = Depends(get_current_user
 async def get_returns(status: Optional[str] = None, user: dict = Depends(get_current_user)):
     try:
         if user.get("role") in ["admin", "super_admin"]:
-            query = supabase.table("returns").select("*, products(name, price), profiles(full_name)")
+            query = get_supabase().table("returns").select("*, products(name, price), profiles(full_name)")
         else:
-            query = supabase.table("returns").select("*, products(name, price)").eq("rider_id", user["id"])
+            query = get_supabase().table("returns").select("*, products(name, price)").eq("rider_id", user["id"])
         
         if status:
             query = query.eq("status", status)
         
-        result = query.order("returned_at", desc=True).execute()
+        result = await run_query(query.order("returned_at", desc=True))
         return result.data
     except Exception as e:
         logger.error(f"Get returns error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/returns/{return_id}/approve")
-async def approve_return(return_id: str, user: dict = Depends(require_admin)):
+async def approve_return(
+    return_id: str,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        # Get return request
-        ret = supabase.table("returns").select("*").eq("id", return_id).execute()
-        if not ret.data:
-            raise HTTPException(status_code=404, detail="Return not found")
-        
-        return_data = ret.data[0]
-        
-        # Update rider stock (decrease)
-        stock = supabase.table("rider_stock").select("quantity").eq("rider_id", return_data["rider_id"]).eq("product_id", return_data["product_id"]).execute()
-        if stock.data:
-            new_qty = stock.data[0]["quantity"] - return_data["quantity"]
-            if new_qty <= 0:
-                supabase.table("rider_stock").delete().eq("rider_id", return_data["rider_id"]).eq("product_id", return_data["product_id"]).execute()
-            else:
-                supabase.table("rider_stock").update({"quantity": new_qty}).eq("rider_id", return_data["rider_id"]).eq("product_id", return_data["product_id"]).execute()
-        
-        # Update warehouse stock (increase)
-        product = supabase.table("products").select("stock_in_warehouse").eq("id", return_data["product_id"]).execute()
-        new_warehouse_stock = product.data[0]["stock_in_warehouse"] + return_data["quantity"]
-        supabase.table("products").update({"stock_in_warehouse": new_warehouse_stock}).eq("id", return_data["product_id"]).execute()
-        
-        # Update return status
-        supabase.table("returns").update({
-            "status": "approved",
-            "approved_by": user["id"],
-            "approved_at": datetime.now(timezone.utc).isoformat()
-        }).eq("id", return_id).execute()
-        
-        # Record in return history
-        supabase.table("return_history").insert({
-            "id": str(uuid.uuid4()),
-            "rider_id": return_data["rider_id"],
-            "product_id": return_data["product_id"],
-            "quantity": return_data["quantity"],
-            "notes": return_data["notes"],
-            "status": "approved",
-            "approved_by": user["id"],
-            "returned_at": return_data["returned_at"],
-            "approved_at": datetime.now(timezone.utc).isoformat()
-        }).execute()
-        
-        # Delete from returns
-        supabase.table("returns").delete().eq("id", return_id).execute()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Get return request
+                return_data = await conn.fetchrow(
+                    "SELECT rider_id, product_id, quantity, notes, returned_at FROM returns WHERE id = $1 FOR UPDATE",
+                    return_id
+                )
+                if return_data is None:
+                    raise HTTPException(status_code=404, detail="Return not found")
+                
+                # Update rider stock (decrease)
+                remaining = await conn.fetchval(
+                    "UPDATE rider_stock SET quantity = quantity - $3 "
+                    "WHERE rider_id = $1 AND product_id = $2 AND quantity >= $3 RETURNING quantity",
+                    return_data["rider_id"], return_data["product_id"], return_data["quantity"]
+                )
+                if remaining is None:
+                    raise HTTPException(status_code=400, detail="Insufficient stock for return")
+                if remaining <= 0:
+                    await conn.execute(
+                        "DELETE FROM rider_stock WHERE rider_id = $1 AND product_id = $2 AND quantity <= 0",
+                        return_data["rider_id"], return_data["product_id"]
+                    )
+                
+                # Update warehouse stock (increase)
+                await conn.execute(
+                    "UPDATE products SET stock_in_warehouse = stock_in_warehouse + $2 WHERE id = $1",
+                    return_data["product_id"], return_data["quantity"]
+                )
+                
+                # Record in return history
+                await conn.execute(
+                    "INSERT INTO return_history "
+                    "(rider_id, product_id, quantity, notes, status, approved_by, returned_at, approved_at) "
+                    "VALUES ($1, $2, $3, $4, 'approved', $5, $6, NOW())",
+                    return_data["rider_id"], return_data["product_id"],
+                    return_data["quantity"], return_data["notes"], user["id"], return_data["returned_at"]
+                )
+                
+                # Delete from returns
+                await conn.execute("DELETE FROM returns WHERE id = $1", return_id)
         
         return {"message": "Return approved successfully"}
     except HTTPException:
@@ -799,29 +1015,30 @@ async def approve_return(return_id: str, user: dict = Depends(require_admin)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/returns/{return_id}/reject")
-async def reject_return(return_id: str, user: dict = Depends(require_admin)):
+async def reject_return(
+    return_id: str,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        ret = supabase.table("returns").select("*").eq("id", return_id).execute()
-        if not ret.data:
-            raise HTTPException(status_code=404, detail="Return not found")
-        
-        return_data = ret.data[0]
-        
-        # Record in return history
-        supabase.table("return_history").insert({
-            "id": str(uuid.uuid4()),
-            "rider_id": return_data["rider_id"],
-            "product_id": return_data["product_id"],
-            "quantity": return_data["quantity"],
-            "notes": return_data["notes"],
-            "status": "rejected",
-            "approved_by": user["id"],
-            "returned_at": return_data["returned_at"],
-            "approved_at": datetime.now(timezone.utc).isoformat()
-        }).execute()
-        
-        # Delete from returns
-        supabase.table("returns").delete().eq("id", return_id).execute()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Remove the return request, keeping its data for the history row
+                return_data = await conn.fetchrow(
+                    "DELETE FROM returns WHERE id = $1 RETURNING rider_id, product_id, quantity, notes, returned_at",
+                    return_id
+                )
+                if return_data is None:
+                    raise HTTPException(status_code=404, detail="Return not found")
+                
+                # Record in return history
+                await conn.execute(
+                    "INSERT INTO return_history "
+                    "(rider_id, product_id, quantity, notes, status, approved_by, returned_at, approved_at) "
+                    "VALUES ($1, $2, $3, $4, 'rejected', $5, $6, NOW())",
+                    return_data["rider_id"], return_data["product_id"],
+                    return_data["quantity"], return_data["notes"], user["id"], return_data["returned_at"]
+                )
         
         return {"message": "Return rejected"}
     except HTTPException:
@@ -836,22 +1053,20 @@ async def reject_return(return_id: str, user: dict = Depends(require_admin)):
 async def create_reject(rej: RejectCreate, user: dict = Depends(get_current_user)):
     try:
         # Check rider stock
-        stock_result = supabase.table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", rej.product_id).execute()
+        stock_result = await run_query(get_supabase().table("rider_stock").select("quantity").eq("rider_id", user["id"]).eq("product_id", rej.product_id))
         
         if not stock_result.data or stock_result.data[0]["quantity"] < rej.quantity:
             raise HTTPException(status_code=400, detail="Insufficient stock for reject")
         
         # Create reject request
         reject_data = {
-            "id": str(uuid.uuid4()),
             "rider_id": user["id"],
             "product_id": rej.product_id,
             "quantity": rej.quantity,
             "notes": rej.notes,
-            "status": "pending",
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "status": "pending"
         }
-        supabase.table("rejects").insert(reject_data).execute()
+        await run_query(get_supabase().table("rejects").insert(reject_data, returning=ReturnMethod.minimal))
         
         return {"message": "Reject request submitted successfully"}
     except HTTPException:
@@ -861,57 +1076,78 @@ async def create_reject(rej: RejectCreate, user: dict = Depends(get_current_user
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/rejects")
-async def get_rejects(status: Optional[str] = None, user: dict = Depends(get_current_user)):
+async def get_rejects(
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    user: dict = Depends(get_current_user),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        if user.get("role") in ["admin", "super_admin"]:
-            query = supabase.table("rejects").select("*, products(name, price), profiles(full_name)")
-        else:
-            query = supabase.table("rejects").select("*, products(name, price)").eq("rider_id", user["id"])
-        
-        if status:
-            query = query.eq("status", status)
-        
-        result = query.order("created_at", desc=True).execute()
-        return result.data
+        rider_id = None if user.get("role") in ["admin", "super_admin"] else user["id"]
+        after_created_at, after_id = decode_cursor(cursor)
+        
+        rows = await pool.fetch(
+            "SELECT j.*, "
+            "CASE WHEN p.id IS NULL THEN NULL ELSE jsonb_build_object('name', p.name, 'price', p.price) END AS products, "
+            "CASE WHEN r.id IS NULL THEN NULL ELSE jsonb_build_object('full_name', r.full_name) END AS profiles "
+            "FROM rejects j "
+            "LEFT JOIN products p ON p.id = j.product_id "
+            "LEFT JOIN profiles r ON r.id = j.rider_id "
+            "WHERE ($1::uuid IS NULL OR j.rider_id = $1) "
+            "AND ($2::text IS NULL OR j.status = $2) "
+            "AND ($3::timestamptz IS NULL OR (j.created_at, j.id) < ($3, $4::uuid)) "
+            "ORDER BY j.created_at DESC, j.id DESC LIMIT $5",
+            rider_id, status, after_created_at, after_id, limit + 1
+        )
+        return paginate(rows, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get rejects error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/rejects/{reject_id}/approve")
-async def approve_reject(reject_id: str, user: dict = Depends(require_admin)):
+async def approve_reject(
+    reject_id: str,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     try:
-        # Get reject request
-        rej = supabase.table("rejects").select("*").eq("id", reject_id).execute()
-        if not rej.data:
-            raise HTTPException(status_code=404, detail="Reject not found")
-        
-        reject_data = rej.data[0]
-        
-        # Update rider stock (decrease) - Product is lost, NOT returned to warehouse
-        stock = supabase.table("rider_stock").select("quantity").eq("rider_id", reject_data["rider_id"]).eq("product_id", reject_data["product_id"]).execute()
-        if stock.data:
-            new_qty = stock.data[0]["quantity"] - reject_data["quantity"]
-            if new_qty <= 0:
-                supabase.table("rider_stock").delete().eq("rider_id", reject_data["rider_id"]).eq("product_id", reject_data["product_id"]).execute()
-            else:
-                supabase.table("rider_stock").update({"quantity": new_qty}).eq("rider_id", reject_data["rider_id"]).eq("product_id", reject_data["product_id"]).execute()
-        
-        # Record in reject history (for loss calculation)
-        supabase.table("reject_history").insert({
-            "id": str(uuid.uuid4()),
-            "rider_id": reject_data["rider_id"],
-            "product_id": reject_data["product_id"],
-            "quantity": reject_data["quantity"],
-            "notes": reject_data["notes"],
-            "status": "approved",
-            "approved_by": user["id"],
-            "created_at": reject_data["created_at"],
-            "approved_at": datetime.now(timezone.utc).isoformat()
-        }).execute()
-        
-        # Delete from rejects
-        supabase.table("rejects").delete().eq("id", reject_id).execute()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Remove the reject request, keeping its data for the history row
+                reject_data = await conn.fetchrow(
+                    "DELETE FROM rejects WHERE id = $1 RETURNING rider_id, product_id, quantity, notes, created_at",
+                    reject_id
+                )
+                if reject_data is None:
+                    raise HTTPException(status_code=404, detail="Reject not found")
+                
+                # Update rider stock (decrease) - Product is lost, NOT returned to warehouse
+                remaining = await conn.fetchval(
+                    "UPDATE rider_stock SET quantity = quantity - $3 "
+                    "WHERE rider_id = $1 AND product_id = $2 RETURNING quantity",
+                    reject_data["rider_id"], reject_data["product_id"], reject_data["quantity"]
+                )
+                if remaining is not None and remaining <= 0:
+                    await conn.execute(
+                        "DELETE FROM rider_stock WHERE rider_id = $1 AND product_id = $2 AND quantity <= 0",
+                        reject_data["rider_id"], reject_data["product_id"]
+                    )
+                
+                # Record in reject history with the loss at today's price (for loss calculation)
+                unit_price = await conn.fetchval("SELECT price FROM products WHERE id = $1", reject_data["product_id"])
+                loss_amount = reject_data["quantity"] * unit_price if unit_price is not None else None
+                await conn.execute(
+                    "INSERT INTO reject_history "
+                    "(rider_id, product_id, quantity, notes, status, approved_by, unit_price, loss_amount, created_at, approved_at) "
+                    "VALUES ($1, $2, $3, $4, 'approved', $5, $6, $7, $8, NOW())",
+                    reject_data["rider_id"], reject_data["product_id"], reject_data["quantity"],
+                    reject_data["notes"], user["id"], unit_price, loss_amount, reject_data["created_at"]
+                )
         
+        report_cache.clear()
         return {"message": "Reject approved - Product marked as loss"}
     except HTTPException:
         raise
@@ -922,86 +1158,111 @@ async def approve_reject(reject_id: str, user: dict = Depends(require_admin)):
 # ==================== STOCK OPNAME ROUTES ====================
 
 @api_router.post("/stock-opname")
-async def create_stock_opname(opname: StockOpnameCreate, user: dict = Depends(require_admin)):
+async def create_stock_opname(
+    opname: StockOpnameCreate,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     """
     Stock Opname: Input remaining stock, auto-calculate sales
     Used for riders without phones or end-of-day reconciliation
     """
     try:
-        opname_id = str(uuid.uuid4())
         total_sales = 0
         sales_records = []
-        
-        for item in opname.items:
-            # Get current rider stock (before opname)
-            stock = supabase.table("rider_stock").select("quantity").eq("rider_id", opname.rider_id).eq("product_id", item.product_id).execute()
-            
-            if stock.data:
-                current_stock = stock.data[0]["quantity"]
-                sold_quantity = current_stock - item.remaining_quantity
-                
-                if sold_quantity < 0:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Remaining stock cannot be more than distributed stock"
-                    )
+        product_ids = [item.product_id for item in opname.items]
+        
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Lock current rider stock (before opname) and read product prices in one query
+                rows = await conn.fetch(
+                    "SELECT s.product_id, s.quantity, p.price, p.name FROM rider_stock s "
+                    "LEFT JOIN products p ON p.id = s.product_id "
+                    "WHERE s.rider_id = $1 AND s.product_id = ANY($2::uuid[]) FOR UPDATE OF s",
+                    opname.rider_id, product_ids
+                )
+                stock_map = {row["product_id"]: row for row in rows}
                 
-                # Get product price for sales calculation
-                product = supabase.table("products").select("price, name").eq("id", item.product_id).execute()
-                if product.data:
-                    sale_amount = sold_quantity * product.data[0]["price"]
-                    total_sales += sale_amount
+                update_ids, update_quantities = [], []
+                delete_ids = []
+                txn_items = []
+                for item in opname.items:
+                    stock = stock_map.get(item.product_id)
+                    if stock is None:
+                        continue
+                    
+                    sold_quantity = stock["quantity"] - item.remaining_quantity
+                    if sold_quantity < 0:
+                        raise HTTPException(
+                            status_code=400, 
+                            detail=f"Remaining stock cannot be more than distributed stock"
+                        )
+                    
+                    if stock["price"] is not None:
+                        price = float(stock["price"])
+                        sale_amount = sold_quantity * price
+                        total_sales += sale_amount
+                        
+                        if sold_quantity > 0:
+                            sales_records.append({
+                                "product_id": str(item.product_id),
+                                "product_name": stock["name"],
+                                "quantity_sold": sold_quantity,
+                                "sale_amount": sale_amount
+                            })
+                            txn_items.append((item.product_id, sold_quantity, price, sale_amount))
                     
-                    if sold_quantity > 0:
-                        sales_records.append({
-                            "product_id": item.product_id,
-                            "product_name": product.data[0]["name"],
-                            "quantity_sold": sold_quantity,
-                            "sale_amount": sale_amount
-                        })
+                    if item.remaining_quantity <= 0:
+                        delete_ids.append(item.product_id)
+                    else:
+                        update_ids.append(item.product_id)
+                        update_quantities.append(item.remaining_quantity)
                 
                 # Update rider stock
-                if item.remaining_quantity <= 0:
-                    supabase.table("rider_stock").delete().eq("rider_id", opname.rider_id).eq("product_id", item.product_id).execute()
-                else:
-                    supabase.table("rider_stock").update({"quantity": item.remaining_quantity}).eq("rider_id", opname.rider_id).eq("product_id", item.product_id).execute()
-        
-        # Create sales transaction from stock opname
-        if sales_records:
-            trans_id = str(uuid.uuid4())
-            supabase.table("transactions").insert({
-                "id": trans_id,
-                "rider_id": opname.rider_id,
-                "total_amount": total_sales,
-                "payment_method": "stock_opname",
-                "notes": f"Penjualan dari Stock Opname - {opname.notes or 'No notes'}",
-                "created_at": datetime.now(timezone.utc).isoformat()
-            }).execute()
-            
-            for record in sales_records:
-                product = supabase.table("products").select("price").eq("id", record["product_id"]).execute()
-                price = product.data[0]["price"] if product.data else 0
+                if update_ids:
+                    await conn.execute(
+                        "UPDATE rider_stock s SET quantity = v.qty "
+                        "FROM unnest($2::uuid[], $3::int[]) AS v(product_id, qty) "
+                        "WHERE s.rider_id = $1 AND s.product_id = v.product_id",
+                        opname.rider_id, update_ids, update_quantities
+                    )
+                if delete_ids:
+                    await conn.execute(
+                        "DELETE FROM rider_stock WHERE rider_id = $1 AND product_id = ANY($2::uuid[])",
+                        opname.rider_id, delete_ids
+                    )
                 
-                supabase.table("transaction_items").insert({
-                    "id": str(uuid.uuid4()),
-                    "transaction_id": trans_id,
-                    "product_id": record["product_id"],
-                    "quantity": record["quantity_sold"],
-                    "price": price,
-                    "subtotal": record["sale_amount"]
-                }).execute()
-        
-        # Record stock opname history
-        supabase.table("stock_opname").insert({
-            "id": opname_id,
-            "rider_id": opname.rider_id,
-            "admin_id": user["id"],
-            "total_sales": total_sales,
-            "notes": opname.notes,
-            "details": json.dumps(sales_records),
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }).execute()
+                # Create sales transaction from stock opname
+                if sales_records:
+                    trans_id = await conn.fetchval(
+                        "INSERT INTO transactions (rider_id, total_amount, payment_method, notes, created_at) "
+                        "VALUES ($1, $2, 'stock_opname', $3, NOW()) RETURNING id",
+                        opname.rider_id, total_sales,
+                        f"Penjualan dari Stock Opname - {opname.notes or 'No notes'}"
+                    )
+                    await insert_records(
+                        conn, "transaction_items",
+                        ["transaction_id", "product_id", "quantity", "price", "subtotal"],
+                        [(trans_id, *txn_item) for txn_item in txn_items]
+                    )
+                
+                # Record stock opname history
+                opname_id = await conn.fetchval(
+                    "INSERT INTO stock_opname (rider_id, admin_id, total_sales, notes, created_at) "
+                    "VALUES ($1, $2, $3, $4, NOW()) RETURNING id",
+                    opname.rider_id, user["id"], total_sales, opname.notes
+                )
+                await insert_records(
+                    conn, "stock_opname_items",
+                    ["opname_id", "product_id", "product_name", "quantity_sold", "sale_amount"],
+                    [
+                        (opname_id, record["product_id"], record["product_name"],
+                         record["quantity_sold"], record["sale_amount"])
+                        for record in sales_records
+                    ]
+                )
         
+        report_cache.clear()
         return {
             "message": "Stock Opname completed successfully",
             "total_sales": total_sales,
@@ -1018,20 +1279,36 @@ async def get_stock_opname_history(
     rider_id: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    user: dict = Depends(require_admin)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     try:
-        query = supabase.table("stock_opname").select("*, rider:profiles!stock_opname_rider_id_fkey(full_name), admin:profiles!stock_opname_admin_id_fkey(full_name)")
-        
-        if rider_id:
-            query = query.eq("rider_id", rider_id)
-        if start_date:
-            query = query.gte("created_at", start_date)
-        if end_date:
-            query = query.lte("created_at", end_date)
-        
-        result = query.order("created_at", desc=True).execute()
-        return result.data
+        after_created_at, after_id = decode_cursor(cursor)
+        
+        rows = await pool.fetch(
+            "SELECT o.*, "
+            "COALESCE((SELECT jsonb_agg(jsonb_build_object("
+            "'product_id', i.product_id, 'product_name', i.product_name, "
+            "'quantity_sold', i.quantity_sold, 'sale_amount', i.sale_amount) "
+            "ORDER BY i.product_name, i.id) "
+            "FROM stock_opname_items i WHERE i.opname_id = o.id), '[]'::jsonb) AS details, "
+            "CASE WHEN r.id IS NULL THEN NULL ELSE jsonb_build_object('full_name', r.full_name) END AS rider, "
+            "CASE WHEN a.id IS NULL THEN NULL ELSE jsonb_build_object('full_name', a.full_name) END AS admin "
+            "FROM stock_opname o "
+            "LEFT JOIN profiles r ON r.id = o.rider_id "
+            "LEFT JOIN profiles a ON a.id = o.admin_id "
+            "WHERE ($1::uuid IS NULL OR o.rider_id = $1) "
+            "AND ($2::text IS NULL OR o.created_at >= $2::timestamptz) "
+            "AND ($3::text IS NULL OR o.created_at <= $3::timestamptz) "
+            "AND ($4::timestamptz IS NULL OR (o.created_at, o.id) < ($4, $5::uuid)) "
+            "ORDER BY o.created_at DESC, o.id DESC LIMIT $6",
+            rider_id, start_date, end_date, after_created_at, after_id, limit + 1
+        )
+        return paginate(rows, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get stock opname error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1039,38 +1316,50 @@ async def get_stock_opname_history(
 # ==================== GPS TRACKING ROUTES ====================
 
 @api_router.post("/gps/update")
-async def update_gps(gps: GPSUpdate, user: dict = Depends(get_current_user)):
+async def update_gps(
+    gps: GPSUpdate,
+    user: dict = Depends(get_current_user),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
     """Update rider GPS location (replaces previous location)"""
     try:
-        # Check if location exists
-        existing = supabase.table("gps_locations").select("id").eq("rider_id", user["id"]).execute()
-        
-        location_data = {
-            "rider_id": user["id"],
-            "latitude": gps.latitude,
-            "longitude": gps.longitude,
-            "updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        
-        if existing.data:
-            # Update existing
-            supabase.table("gps_locations").update(location_data).eq("rider_id", user["id"]).execute()
-        else:
-            # Create new
-            location_data["id"] = str(uuid.uuid4())
-            supabase.table("gps_locations").insert(location_data).execute()
+        # One row per rider (UNIQUE rider_id), so insert or overwrite in a single statement
+        await pool.execute(
+            "INSERT INTO gps_locations (rider_id, latitude, longitude, updated_at) VALUES ($1, $2, $3, NOW()) "
+            "ON CONFLICT (rider_id) DO UPDATE SET latitude = EXCLUDED.latitude, "
+            "longitude = EXCLUDED.longitude, updated_at = EXCLUDED.updated_at",
+            user["id"], gps.latitude, gps.longitude
+        )
         
         return {"message": "Location updated"}
     except Exception as e:
         logger.error(f"GPS update error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/gps/locations")
-async def get_all_locations(user: dict = Depends(require_admin)):
-    """Get all riders' last locations (admin only)"""
+@api_router.get("/gps/locations", response_class=ORJSONResponse)
+async def get_all_locations(
+    since: Optional[str] = None,
+    user: dict = Depends(require_admin),
+    pool: asyncpg.Pool = Depends(get_pool)
+):
+    """Get all riders' last locations (admin only), optionally only those updated since a timestamp"""
     try:
-        result = supabase.table("gps_locations").select("*, profiles(full_name, avatar_url)").execute()
-        return result.data
+        cached = location_cache.get(since)
+        if cached is not None:
+            return ORJSONResponse(cached)
+        
+        rows = await pool.fetch(
+            "SELECT g.id, g.rider_id, g.latitude, g.longitude, g.updated_at, "
+            "CASE WHEN p.id IS NULL THEN NULL "
+            "ELSE jsonb_build_object('full_name', p.full_name, 'avatar_url', p.avatar_url) END AS profiles "
+            "FROM gps_locations g LEFT JOIN profiles p ON p.id = g.rider_id "
+            "WHERE ($1::text IS NULL OR g.updated_at >= $1::timestamptz) "
+            "ORDER BY g.updated_at DESC LIMIT $2",
+            since, LOCATIONS_LIMIT
+        )
+        locations = [record_to_dict(row) for row in rows]
+        location_cache[since] = locations
+        return ORJSONResponse(locations)
     except Exception as e:
         logger.error(f"Get locations error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1078,35 +1367,27 @@ async def get_all_locations(user: dict = Depends(require_admin)):
 # ==================== USER MANAGEMENT ROUTES ====================
 
 @api_router.get("/users")
-async def get_users(user: dict = Depends(require_admin)):
+async def get_users(user: dict = Depends(require_admin), pool: asyncpg.Pool = Depends(get_pool)):
     try:
-        result = supabase.table("profiles").select("id, email, full_name, phone, avatar_url, created_at").execute()
-        
-        users = []
-        for u in result.data:
-            role_result = supabase.table("user_roles").select("role").eq("user_id", u["id"]).execute()
-            u["role"] = role_result.data[0]["role"] if role_result.data else "rider"
-            users.append(u)
-        
-        return users
+        rows = await pool.fetch(
+            "SELECT p.id, p.email, p.full_name, p.phone, p.avatar_url, p.created_at, "
+            "COALESCE(r.role, 'rider') AS role "
+            "FROM profiles p LEFT JOIN user_roles r ON r.user_id = p.id"
+        )
+        return [record_to_dict(row) for row in rows]
     except Exception as e:
         logger.error(f"Get users error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/users/riders")
-async def get_riders(user: dict = Depends(require_admin)):
+async def get_riders(user: dict = Depends(require_admin), pool: asyncpg.Pool = Depends(get_pool)):
     """Get all riders"""
     try:
-        # Get rider role user ids
-        roles = supabase.table("user_roles").select("user_id").eq("role", "rider").execute()
-        rider_ids = [r["user_id"] for r in roles.data]
-        
-        if not rider_ids:
-            return []
-        
-        # Get profiles
-        result = supabase.table("profiles").select("id, email, full_name, phone, avatar_url").in_("id", rider_ids).execute()
-        return result.data
+        rows = await pool.fetch(
+            "SELECT p.id, p.email, p.full_name, p.phone, p.avatar_url "
+            "FROM profiles p JOIN user_roles r ON r.user_id = p.id WHERE r.role = 'rider'"
+        )
+        return [record_to_dict(row) for row in rows]
     except Exception as e:
         logger.error(f"Get riders error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1118,7 +1399,8 @@ async def update_user_role(user_id: str, role: str, user: dict = Depends(require
         if role not in ["rider", "admin", "super_admin"]:
             raise HTTPException(status_code=400, detail="Invalid role")
         
-        supabase.table("user_roles").update({"role": role}).eq("user_id", user_id).execute()
+        await run_query(get_supabase().table("user_roles").update({"role": role}, returning=ReturnMethod.minimal).eq("user_id", user_id))
+        invalidate_cached_user(user_id)
         return {"message": "Role updated successfully"}
     except HTTPException:
         raise
@@ -1130,8 +1412,9 @@ async def update_user_role(user_id: str, role: str, user: dict = Depends(require
 async def delete_user(user_id: str, user: dict = Depends(require_super_admin)):
     """Delete user (super admin only)"""
     try:
-        supabase.table("user_roles").delete().eq("user_id", user_id).execute()
-        supabase.table("profiles").delete().eq("id", user_id).execute()
+        await run_query(get_supabase().table("user_roles").delete(returning=ReturnMethod.minimal).eq("user_id", user_id))
+        await run_query(get_supabase().table("profiles").delete(returning=ReturnMethod.minimal).eq("id", user_id))
+        invalidate_cached_user(user_id)
         return {"message": "User deleted successfully"}
     except Exception as e:
         logger.error(f"Delete user error: {e}")
@@ -1139,100 +1422,62 @@ async def delete_user(user_id: str, user: dict = Depends(require_super_admin)):
 
 # ==================== REPORTS ROUTES ====================
 
-@api_router.get("/reports/summary")
+@api_router.get("/reports/summary", response_class=ORJSONResponse)
 async def get_report_summary(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     rider_id: Optional[str] = None,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_user),
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     try:
-        # Build transaction query
-        query = supabase.table("transactions").select("*")
-        
         if user.get("role") not in ["admin", "super_admin"]:
-            query = query.eq("rider_id", user["id"])
-        elif rider_id:
-            query = query.eq("rider_id", rider_id)
-        
-        if start_date:
-            query = query.gte("created_at", start_date)
-        if end_date:
-            query = query.lte("created_at", end_date)
-        
-        transactions = query.execute()
-        
-        # Calculate summary
-        total_sales = sum(t["total_amount"] for t in transactions.data)
-        total_transactions = len(transactions.data)
-        
-        # Get reject history for loss calculation
-        reject_query = supabase.table("reject_history").select("*, products(price)")
-        if start_date:
-            reject_query = reject_query.gte("created_at", start_date)
-        if end_date:
-            reject_query = reject_query.lte("created_at", end_date)
-        
-        rejects = reject_query.execute()
-        total_loss = sum(r["quantity"] * (r["products"]["price"] if r.get("products") else 0) for r in rejects.data)
-        
-        return {
-            "total_sales": total_sales,
-            "total_transactions": total_transactions,
-            "total_loss": total_loss,
-            "net_profit": total_sales - total_loss
+            rider_id = user["id"]
+        
+        cache_key = ("summary", rider_id, start_date, end_date)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return ORJSONResponse(cached)
+        
+        # Totals are computed in Postgres, see report_summary() in database_schema.sql
+        summary = record_to_dict(await pool.fetchrow(
+            "SELECT * FROM report_summary($1::uuid, $2::text::timestamptz, $3::text::timestamptz)",
+            rider_id, start_date, end_date
+        ))
+        
+        result = {
+            "total_sales": summary["total_sales"],
+            "total_transactions": summary["total_transactions"],
+            "total_loss": summary["total_loss"],
+            "net_profit": summary["total_sales"] - summary["total_loss"]
         }
+        report_cache[cache_key] = result
+        return ORJSONResponse(result)
     except Exception as e:
         logger.error(f"Get summary error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/reports/leaderboard")
+@api_router.get("/reports/leaderboard", response_class=ORJSONResponse)
 async def get_leaderboard(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    user: dict = Depends(get_current_user)
+    user: dict = Depends(get_current_user),
+    pool: asyncpg.Pool = Depends(get_pool)
 ):
     try:
-        # Get all transactions
-        query = supabase.table("transactions").select("rider_id, total_amount")
-        
-        if start_date:
-            query = query.gte("created_at", start_date)
-        if end_date:
-            query = query.lte("created_at", end_date)
-        
-        transactions = query.execute()
-        
-        # Aggregate by rider
-        rider_sales = {}
-        for t in transactions.data:
-            rider_id = t["rider_id"]
-            if rider_id not in rider_sales:
-                rider_sales[rider_id] = {"total_sales": 0, "total_transactions": 0}
-            rider_sales[rider_id]["total_sales"] += t["total_amount"]
-            rider_sales[rider_id]["total_transactions"] += 1
-        
-        # Get rider names
-        if rider_sales:
-            profiles = supabase.table("profiles").select("id, full_name, avatar_url").in_("id", list(rider_sales.keys())).execute()
-            profile_map = {p["id"]: p for p in profiles.data}
-            
-            leaderboard = []
-            for rider_id, stats in rider_sales.items():
-                profile = profile_map.get(rider_id, {})
-                leaderboard.append({
-                    "rider_id": rider_id,
-                    "full_name": profile.get("full_name", "Unknown"),
-                    "avatar_url": profile.get("avatar_url"),
-                    "total_sales": stats["total_sales"],
-                    "total_transactions": stats["total_transactions"]
-                })
-            
-            # Sort by total sales descending
-            leaderboard.sort(key=lambda x: x["total_sales"], reverse=True)
-            return leaderboard
-        
-        return []
+        cache_key = ("leaderboard", start_date, end_date)
+        cached = report_cache.get(cache_key)
+        if cached is not None:
+            return ORJSONResponse(cached)
+        
+        # Aggregated per rider in Postgres, see leaderboard() in database_schema.sql
+        rows = await pool.fetch(
+            "SELECT * FROM leaderboard($1::text::timestamptz, $2::text::timestamptz)",
+            start_date, end_date
+        )
+        leaderboard = [record_to_dict(row) for row in rows]
+        report_cache[cache_key] = leaderboard
+        return ORJSONResponse(leaderboard)
     except Exception as e:
         logger.error(f"Get leaderboard error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1250,6 +1495,9 @@ async def health_check():
 # Include the router in the main app
 app.include_router(api_router)
 
+# Compress large list responses; CORS is added last so it wraps the compressed response
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1257,3 +1505,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "8001")),
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        access_log=False,
+    )
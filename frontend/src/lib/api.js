@@ -91,7 +91,7 @@ export const returnsAPI = {
 
 // Reject APIs
 export const rejectsAPI = {
-  getAll: (status) => api.get('/rejects', { params: { status } }),
+  getAll: (status, cursor) => api.get('/rejects', { params: { status, cursor } }),
   create: (data) => api.post('/rejects', data),
   approve: (id) => api.put(`/rejects/${id}/approve`),
   reject: (id) => api.put(`/rejects/${id}/reject`),
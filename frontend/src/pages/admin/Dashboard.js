@@ -149,6 +149,7 @@ export default function AdminDashboard() {
   const [stats, setStats] = useState(null);
   const [pendingReturns, setPendingReturns] = useState([]);
   const [pendingRejects, setPendingRejects] = useState([]);
+  const [moreRejects, setMoreRejects] = useState(false);
   const [leaderboard, setLeaderboard] = useState([]);
   const [loading, setLoading] = useState(true);
 
@@ -163,7 +164,8 @@ export default function AdminDashboard() {
       ]);
       setStats(summaryRes.data);
       setPendingReturns(returnsRes.data);
-      setPendingRejects(rejectsRes.data);
+      setPendingRejects(rejectsRes.data.items);
+      setMoreRejects(Boolean(rejectsRes.data.next_cursor));
       setLeaderboard(leaderboardRes.data);
     } catch (error) {
       console.error('Error fetching dashboard data:', error);
@@ -280,7 +282,7 @@ export default function AdminDashboard() {
                 </div>
                 Reject Menunggu
                 {pendingRejects.length > 0 && (
-                  <Badge variant="destructive" className="ml-1">{pendingRejects.length}</Badge>
+                  <Badge variant="destructive" className="ml-1">{pendingRejects.length}{moreRejects ? '+' : ''}</Badge>
                 )}
               </CardTitle>
             </CardHeader>
@@ -9,7 +9,9 @@ import { AlertTriangle, Check, X, Loader2 } from 'lucide-react';
 
 export default function Rejects() {
   const [pendingRejects, setPendingRejects] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [processing, setProcessing] = useState({});
 
   const fetchData = async () => {
@@ -18,7 +20,8 @@ export default function Rejects() {
       const [pendingRes] = await Promise.all([
         rejectsAPI.getAll('pending')
       ]);
-      setPendingRejects(pendingRes.data);
+      setPendingRejects(pendingRes.data.items);
+      setNextCursor(pendingRes.data.next_cursor);
     } catch (error) {
       console.error('Error fetching data:', error);
     } finally {
@@ -26,6 +29,19 @@ export default function Rejects() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await rejectsAPI.getAll('pending', nextCursor);
+      setPendingRejects((prev) => [...prev, ...res.data.items]);
+      setNextCursor(res.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more rejects:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
@@ -88,7 +104,7 @@ export default function Rejects() {
               <AlertTriangle className="w-5 h-5" />
               Permintaan Reject
               {pendingRejects.length > 0 && (
-                <Badge variant="destructive">{pendingRejects.length}</Badge>
+                <Badge variant="destructive">{pendingRejects.length}{nextCursor ? '+' : ''}</Badge>
               )}
             </CardTitle>
           </CardHeader>
@@ -152,6 +168,12 @@ export default function Rejects() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <Button variant="outline" className="w-full" onClick={loadMore} disabled={loadingMore}>
+                    {loadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                    Muat lebih banyak
+                  </Button>
+                )}
               </div>
             )}
           </CardContent>
@@ -13,6 +13,8 @@ export default function StockOpname() {
   const [products, setProducts] = useState([]);
   const [riders, setRiders] = useState([]);
   const [opnameHistory, setOpnameHistory] = useState([]);
+  const [historyCursor, setHistoryCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
   
@@ -34,7 +36,8 @@ export default function StockOpname() {
       ]);
       setProducts(productsRes.data);
       setRiders(ridersRes.data);
-      setOpnameHistory(opnameRes.data);
+      setOpnameHistory(opnameRes.data.items);
+      setHistoryCursor(opnameRes.data.next_cursor);
     } catch (error) {
       console.error('Error fetching data:', error);
     } finally {
@@ -42,6 +45,19 @@ export default function StockOpname() {
     }
   };
 
+  const loadMoreHistory = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await stockOpnameAPI.getAll({ cursor: historyCursor });
+      setOpnameHistory((prev) => [...prev, ...res.data.items]);
+      setHistoryCursor(res.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more history:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchData();
   }, []);
@@ -230,7 +246,7 @@ export default function StockOpname() {
                   <p className="text-center text-gray-500 py-4">Belum ada riwayat</p>
                 ) : (
                   <div className="space-y-3 max-h-[600px] overflow-y-auto">
-                    {opnameHistory.slice(0, 20).map((opname) => (
+                    {opnameHistory.map((opname) => (
                       <div key={opname.id} className="p-3 bg-gray-50 rounded-lg">
                         <div className="flex items-center justify-between mb-1">
                           <span className="font-medium text-sm">{opname.rider?.full_name}</span>
@@ -241,6 +257,12 @@ export default function StockOpname() {
                         </p>
                       </div>
                     ))}
+                    {historyCursor && (
+                      <Button variant="outline" size="sm" className="w-full" onClick={loadMoreHistory} disabled={loadingMore}>
+                        {loadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                        Muat lebih banyak
+                      </Button>
+                    )}
                   </div>
                 )}
               </CardContent>
@@ -0,0 +1,126 @@
+"""
+Tests for decode_access_token, the hand-rolled HS256 verifier used on the auth hot path.
+Tokens are produced with PyJWT so the verifier is checked against the reference encoder.
+"""
+
+import base64
+import hashlib
+import hmac
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import jwt
+import orjson
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from server import JWT_KEY_BYTES, create_access_token, decode_access_token  # noqa: E402
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def forge(header: dict, payload: dict, key: bytes = JWT_KEY_BYTES) -> str:
+    """Sign an arbitrary header/payload pair the way an HS256 issuer would"""
+    signing_input = f"{b64url(orjson.dumps(header))}.{b64url(orjson.dumps(payload))}"
+    signature = hmac.new(key, signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+
+def test_round_trip_with_pyjwt():
+    claims = {"sub": "7f3c9a52-5e7c-4d1b-8f1a-0e3b5a2c9d11", "role": "admin", "exp": int(time.time()) + 60}
+    token = jwt.encode(claims, JWT_KEY_BYTES, algorithm="HS256")
+    assert decode_access_token(token) == claims
+
+
+def test_round_trip_with_create_access_token():
+    token = create_access_token({"sub": "user-1", "role": "rider"})
+    payload = decode_access_token(token)
+    assert payload["sub"] == "user-1"
+    assert payload["role"] == "rider"
+    assert payload == jwt.decode(token, JWT_KEY_BYTES, algorithms=["HS256"])
+
+
+def test_token_without_exp_is_accepted():
+    token = jwt.encode({"sub": "user-1"}, JWT_KEY_BYTES, algorithm="HS256")
+    assert decode_access_token(token) == {"sub": "user-1"}
+
+
+def test_tampered_signature_is_rejected():
+    header, payload, signature = create_access_token({"sub": "user-1"}).split(".")
+    flipped = signature[:-2] + ("A" if signature[-2] != "A" else "B") + signature[-1]
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_access_token(f"{header}.{payload}.{flipped}")
+
+
+def test_tampered_payload_is_rejected():
+    header, _, signature = create_access_token({"sub": "user-1", "role": "rider"}).split(".")
+    payload = b64url(orjson.dumps({"sub": "user-1", "role": "super_admin", "exp": int(time.time()) + 60}))
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_access_token(f"{header}.{payload}.{signature}")
+
+
+def test_wrong_key_is_rejected():
+    token = jwt.encode({"sub": "user-1"}, b"another-secret", algorithm="HS256")
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_access_token(token)
+
+
+def test_alg_none_is_rejected():
+    header = b64url(orjson.dumps({"alg": "none", "typ": "JWT"}))
+    payload = b64url(orjson.dumps({"sub": "user-1", "role": "super_admin"}))
+    for token in (f"{header}.{payload}.", f"{header}.{payload}"):
+        with pytest.raises(jwt.InvalidTokenError):
+            decode_access_token(token)
+
+
+@pytest.mark.parametrize("alg", ["HS384", "HS512", "RS256", "hs256", None])
+def test_other_algorithms_are_rejected(alg):
+    header = {"typ": "JWT"} if alg is None else {"alg": alg, "typ": "JWT"}
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_access_token(forge(header, {"sub": "user-1"}))
+
+
+def test_pyjwt_hs512_token_is_rejected():
+    token = jwt.encode({"sub": "user-1"}, JWT_KEY_BYTES, algorithm="HS512")
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_access_token(token)
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "abc",
+    "a.b",
+    "a.b.c.d",
+    "!!!.@@@.###",
+    "eyJhbGciOiJIUzI1NiJ9.bm90IGpzb24.c2ln",
+    f"{b64url(b'[1, 2]')}.{b64url(b'{}')}.c2ln",
+    f"{b64url(orjson.dumps({'alg': 'HS256'}))}.{b64url(b'[]')}.c2ln",
+    "é.ü.ß",
+    "eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiIxIn0.sïg",
+])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_access_token(token)
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_access_token(token)
+
+
+@pytest.mark.parametrize("exp", ["9999999999", [1], {"t": 1}])
+def test_non_numeric_exp_is_rejected(exp):
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"sub": "user-1", "exp": exp})
+    with pytest.raises(jwt.DecodeError):
+        decode_access_token(token)
+
+
+def test_null_exp_is_treated_as_missing():
+    token = forge({"alg": "HS256", "typ": "JWT"}, {"sub": "user-1", "exp": None})
+    assert decode_access_token(token) == {"sub": "user-1", "exp": None}